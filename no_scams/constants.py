@@ -5,7 +5,7 @@ SPECIAL_GUILD_CHANNELS = {
     875392637299990628: 973232047193751582,
     840335525621268520: 965770485751230534,
 }
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
 DISCORD_INVITE = (
     r"(?:https?://)?(?:www\.)?discord(?:\.com|app\.com|\.gg)/(?:invite/)?([a-zA-Z0-9\-]{2,32})"
     r"|(?:https?://)?(?:www\.)?discord(?:\.com|app\.com|\.gg)/events/\d+/\d+"
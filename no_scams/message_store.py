@@ -1,24 +1,33 @@
+import asyncio
 import datetime
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass
 from typing import Self
 
 import discord
-import imagehash
 
-from no_scams.constants import CONSECUTIVE_WINDOW_MINUTES, IMAGE_EXTENSIONS, MAX_MESSAGE_NUM
-from no_scams.utils import all_different, all_same, contains_url, extract_image_hash
+from no_scams.constants import CONSECUTIVE_WINDOW_MINUTES, MAX_MESSAGE_NUM
+from no_scams.utils import (
+    all_different,
+    all_same,
+    contains_url,
+    extract_image_hash,
+    is_image_attachment,
+)
 
 logger = logging.getLogger("discord.bot.message_store")
 
+CONSECUTIVE_WINDOW = datetime.timedelta(minutes=CONSECUTIVE_WINDOW_MINUTES)
 
-@dataclass(kw_only=True)
+
+@dataclass(kw_only=True, slots=True)
 class Message:
     id: int
     channel_id: int
     content: str
-    image_hashes: frozenset[imagehash.ImageHash]
+    image_hashes: tuple[int, ...]
+    """Sorted, deduplicated image hashes so equal sets of images compare equal."""
     created_at: datetime.datetime
 
     def __str__(self) -> str:
@@ -29,73 +38,70 @@ class Message:
 
     @classmethod
     async def from_discord_message(cls, message: discord.Message) -> Self:
-        image_hashes = []
-
-        for attachment in message.attachments:
-            if attachment.content_type is None:
-                continue
-            if not attachment.content_type.startswith("image/"):
-                continue
-
-            filename = attachment.filename.lower()
-            if not any(filename.endswith(ext) for ext in IMAGE_EXTENSIONS):
-                continue
-
-            await extract_image_hash(image_hashes, attachment)
+        image_hashes: tuple[int, ...] = ()
+        # Most messages have no attachments, skip scheduling the hash tasks entirely
+        if message.attachments:
+            hashes = await asyncio.gather(
+                *(
+                    extract_image_hash(attachment)
+                    for attachment in message.attachments
+                    if is_image_attachment(attachment)
+                )
+            )
+            image_hashes = tuple(sorted(set(hashes)))
 
         return cls(
             id=message.id,
             channel_id=message.channel.id,
             content=message.content,
-            image_hashes=frozenset(image_hashes),
+            image_hashes=image_hashes,
             created_at=message.created_at,
         )
 
 
-class MessageStore:
-    def __init__(self) -> None:
-        self._messages: defaultdict[tuple[int, int], list[Message]] = defaultdict(list)
-        """(guild ID, author ID) -> list of messages"""
+def message_key(guild_id: int, author_id: int) -> int:
+    """Pack a (guild ID, author ID) pair into one int, snowflakes fit in 64 bits."""
+    return (guild_id << 64) | author_id
+
 
-    async def add_message(self, message: discord.Message) -> None:
-        if message.guild is None:
-            return
+class MessageStore:
+    __slots__ = ("_messages",)
 
-        self._messages[message.guild.id, message.author.id].append(
-            await Message.from_discord_message(message)
+    def __init__(self) -> None:
+        self._messages: defaultdict[int, deque[Message]] = defaultdict(
+            lambda: deque(maxlen=MAX_MESSAGE_NUM)
         )
-        self.remove_message(message.guild.id, message.author.id)
+        """message_key(guild ID, author ID) -> last MAX_MESSAGE_NUM messages, oldest evicted on append"""
 
-    def remove_message(self, guild_id: int, author_id: int) -> None:
-        if len(self._messages[guild_id, author_id]) > MAX_MESSAGE_NUM:
-            self._messages[guild_id, author_id].pop(0)
+    async def add_message(self, key: int, message: discord.Message) -> None:
+        self._messages[key].append(await Message.from_discord_message(message))
 
-    def clear_messages(self, guild_id: int, author_id: int) -> None:
-        self._messages[guild_id, author_id].clear()
+    def clear_messages(self, key: int) -> None:
+        self._messages[key].clear()
 
-    def get_scam_messages(self, message: discord.Message) -> list[Message]:
-        if message.guild is None:
-            return []
-        return self._messages[message.guild.id, message.author.id]
+    def get_scam_messages(self, key: int) -> deque[Message]:
+        return self._messages[key]
 
-    def is_scam(self, message: discord.Message) -> bool:
-        messages = self.get_scam_messages(message)
+    def is_scam(self, key: int) -> bool:
+        messages = self.get_scam_messages(key)
         if len(messages) < MAX_MESSAGE_NUM:
             return False
 
-        same_content = all_same([msg.content for msg in messages])
-        different_channels = all_different([msg.channel_id for msg in messages])
-        all_contain_url = all(contains_url(msg.content) for msg in messages)
-        same_images = all_same([msg.image_hashes for msg in messages])
-        all_have_images = all(msg.image_hashes for msg in messages)
-        all_no_text_content = all(not msg.content.strip() for msg in messages)
-        message_time_window = max(msg.created_at for msg in messages) - min(
-            msg.created_at for msg in messages
-        )
-        within_consecutive_window = message_time_window <= datetime.timedelta(
-            minutes=CONSECUTIVE_WINDOW_MINUTES
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_scam_check(messages)
+
+        # Cheapest and most selective checks first, ordinary users fail on channels
+        if not different_channels(messages):
+            return False
+        if not within_consecutive_window(messages):
+            return False
+        if all_same(msg.content for msg in messages):
+            return True
+        if all_same(msg.image_hashes for msg in messages):
+            return True
+        return all(msg.image_hashes and not msg.content.strip() for msg in messages)
 
+    def _log_scam_check(self, messages: deque[Message]) -> None:
         logger.debug(
             "Checking if messages are scam:\n"
             "Messages: %s\n"
@@ -107,17 +113,26 @@ class MessageStore:
             "All no text content: %s\n"
             "Within consecutive window: %s",
             messages,
-            same_content,
-            different_channels,
-            all_contain_url,
-            same_images,
-            all_have_images,
-            all_no_text_content,
-            within_consecutive_window,
+            all_same(msg.content for msg in messages),
+            different_channels(messages),
+            all(contains_url(msg.content) for msg in messages),
+            all_same(msg.image_hashes for msg in messages),
+            all(msg.image_hashes for msg in messages),
+            all(not msg.content.strip() for msg in messages),
+            within_consecutive_window(messages),
         )
 
-        return (
-            different_channels
-            and within_consecutive_window
-            and (same_content or same_images or (all_have_images and all_no_text_content))
-        )
+
+def different_channels(messages: deque[Message]) -> bool:
+    if len(messages) == 3:
+        # Default window size, direct comparisons avoid building a set (PLR1714's fix would)
+        c0, c1, c2 = messages[0].channel_id, messages[1].channel_id, messages[2].channel_id
+        return c0 != c1 and c1 != c2 and c0 != c2  # noqa: PLR1714
+    return all_different([msg.channel_id for msg in messages])
+
+
+def within_consecutive_window(messages: deque[Message]) -> bool:
+    message_time_window = max(msg.created_at for msg in messages) - min(
+        msg.created_at for msg in messages
+    )
+    return message_time_window <= CONSECUTIVE_WINDOW
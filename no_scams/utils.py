@@ -1,30 +1,67 @@
+import asyncio
 import io
+import itertools
 import re
+from collections.abc import Iterable
 from typing import Any
 
 import discord
-import imagehash
 from PIL import Image
 
-from no_scams.constants import DISCORD_INVITE
+from no_scams.constants import DISCORD_INVITE, IMAGE_EXTENSIONS
 
+HASH_SIZE = 8
+_URL_SCHEMES = ("http://", "https://")
+_DISCORD_INVITE_RE = re.compile(DISCORD_INVITE)
 
-def get_image_hash(fp: io.BytesIO) -> imagehash.ImageHash:
-    return imagehash.average_hash(Image.open(fp))
+
+def get_image_hash(fp: io.BytesIO) -> int:
+    """Difference hash (dHash) of the image, one bit per horizontal gradient packed into an int."""
+    image = Image.open(fp)
+    # Let the JPEG decoder downscale and grayscale while decoding, no-op for other formats
+    image.draft("L", (HASH_SIZE + 1, HASH_SIZE))
+    pixels = (
+        image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).tobytes()
+    )
+
+    image_hash = 0
+    for row in range(0, len(pixels), HASH_SIZE + 1):
+        for left, right in itertools.pairwise(pixels[row : row + HASH_SIZE + 1]):
+            image_hash = (image_hash << 1) | (right > left)
+    return image_hash
+
+
+def _contains_http_url(content: str) -> bool:
+    """Equivalent to `re.search(r"https?://\\S+", content)` without the regex engine."""
+    for scheme in _URL_SCHEMES:
+        start = content.find(scheme)
+        while start != -1:
+            end = start + len(scheme)
+            if end < len(content) and not content[end].isspace():
+                return True
+            start = content.find(scheme, end)
+    return False
 
 
 def contains_url(content: str) -> bool:
-    contains_discord_invite = re.search(DISCORD_INVITE, content) is not None
-    contains_url = re.search(r"https?://\S+", content) is not None
-    return contains_discord_invite or contains_url
+    if _contains_http_url(content):
+        return True
+    # Invites can be posted without a scheme, only run the regex when they could match
+    return "discord" in content and _DISCORD_INVITE_RE.search(content) is not None
 
 
-def all_same(lst: list[Any]) -> bool:
-    if not lst or len(lst) == 1:
+def all_same(items: Iterable[Any]) -> bool:
+    it = iter(items)
+    first = next(it, None)
+    if not first:
         return False
-    if not lst[0]:
-        return False
-    return all(x == lst[0] for x in lst)
+
+    has_more = False
+    for x in it:
+        if x != first:
+            return False
+        has_more = True
+    return has_more
 
 
 def all_different(lst: list[Any]) -> bool:
@@ -33,11 +70,14 @@ def all_different(lst: list[Any]) -> bool:
     return len(set(lst)) == len(lst)
 
 
-async def extract_image_hash(
-    image_hashes: list[imagehash.ImageHash], attachment: discord.Attachment
-) -> None:
-    buffer = io.BytesIO()
+def is_image_attachment(attachment: discord.Attachment) -> bool:
+    content_type = attachment.content_type
+    if content_type is None or not content_type.startswith("image/"):
+        return False
+    return attachment.filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+async def extract_image_hash(attachment: discord.Attachment) -> int:
     image_data = await attachment.read()
-    buffer.write(image_data)
-    buffer.seek(0)
-    image_hashes.append(get_image_hash(buffer))
+    # Decoding and hashing is CPU-bound, keep it off the event loop
+    return await asyncio.to_thread(get_image_hash, io.BytesIO(image_data))
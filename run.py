@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 
 from no_scams.constants import SPECIAL_GUILD_CHANNELS, TIMEOUT_MINUTES
 from no_scams.health import HealthCheckServer
-from no_scams.message_store import Message, MessageStore
+from no_scams.message_store import Message, MessageStore, message_key
 
 logger = logging.getLogger("discord.bot")
 
@@ -26,16 +26,34 @@ class NoScamBot(commands.Bot):
     def __init__(self) -> None:
         super().__init__(commands.when_mentioned, intents=intents)
         self.store = MessageStore()
-        self.actioned_users: set[tuple[int, int]] = set()
+        self.actioned_users: set[int] = set()
         self.user: discord.ClientUser
 
     async def delete_message(
         self, message: Message | discord.Message | discord.PartialMessage
     ) -> None:
         if isinstance(message, Message):
-            channel = bot.get_channel(message.channel_id) or await bot.fetch_channel(
-                message.channel_id
-            )
+            try:
+                channel = bot.get_channel(message.channel_id) or await bot.fetch_channel(
+                    message.channel_id
+                )
+            except discord.HTTPException as e:
+                logger.warning(
+                    "Failed to fetch channel %s to delete message %s: %s (code %s)",
+                    message.channel_id,
+                    message.id,
+                    e.text,
+                    e.code,
+                )
+                return
+            except Exception:
+                logger.exception(
+                    "Unexpected error fetching channel %s to delete message %s",
+                    message.channel_id,
+                    message.id,
+                )
+                return
+
             if isinstance(
                 channel, discord.ForumChannel | discord.CategoryChannel | discord.abc.PrivateChannel
             ):
@@ -116,7 +134,7 @@ async def on_message(message: discord.Message) -> None:
     if message.author.bot or message.guild is None or message.webhook_id is not None:
         return
 
-    key = (message.guild.id, message.author.id)
+    key = message_key(message.guild.id, message.author.id)
 
     if key in bot.actioned_users:
         logger.info(
@@ -126,21 +144,24 @@ async def on_message(message: discord.Message) -> None:
         return
 
     store = bot.store
-    await store.add_message(message)
+    await store.add_message(key, message)
 
-    if store.is_scam(message):
+    if store.is_scam(key):
         logger.info(
             "Scam detected from %r in %r: %r", message.author, message.guild, message.content
         )
 
         bot.actioned_users.add(key)
         try:
-            scam_messages = store.get_scam_messages(message)
-            for scam_message in scam_messages:
-                await bot.delete_message(scam_message)
+            # Scam messages are always in different channels, so bulk delete never applies.
+            # delete_message logs and swallows its own errors, so gather never raises here.
+            scam_messages = store.get_scam_messages(key)
+            await asyncio.gather(
+                *(bot.delete_message(scam_message) for scam_message in scam_messages)
+            )
             await bot.timeout_member(message)
         finally:
-            store.clear_messages(*key)
+            store.clear_messages(key)
             bot.actioned_users.discard(key)
 
     await bot.process_commands(message)